@@ -920,6 +920,108 @@ class TestFX(JitTestCase):
                 with self.assertRaisesRegex(RuntimeError, 'but it still had .* users in the graph'):
                     traced.graph.erase_node(node)
 
+    def test_erase_node_updates_users(self):
+        graph = torch.fx.Graph()
+        x = torch.fx.Proxy(graph.placeholder('x'))
+        relu = torch.relu(x)
+        neg = torch.neg(relu)
+        output = graph.output(x.node)
+
+        graph.erase_node(neg.node)
+        self.assertEqual(len(relu.node.users), 0)
+        self.assertEqual(neg.node.args, (None,))
+
+        # relu is now unused, so it can be erased too
+        graph.erase_node(relu.node)
+        self.assertEqual(list(x.node.users), [output])
+        graph.lint()
+
+    def test_find_nodes(self):
+        graph = torch.fx.Graph()
+        x = torch.fx.Proxy(graph.placeholder('x'))
+        relu = torch.relu(x)
+        neg = torch.neg(relu)
+        relu2 = torch.relu(neg)
+        graph.output(relu2.node)
+
+        self.assertEqual(graph.find_nodes(op='placeholder'), [x.node])
+        self.assertEqual(graph.find_nodes(op='call_function'), [relu.node, neg.node, relu2.node])
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [relu.node, relu2.node])
+        self.assertEqual(graph.find_nodes(op='call_method', target=torch.relu), [])
+
+        # erased nodes are no longer found
+        relu2.node.replace_all_uses_with(neg.node)
+        graph.erase_node(relu2.node)
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [relu.node])
+
+    def test_find_nodes_after_target_change(self):
+        graph = torch.fx.Graph()
+        x = torch.fx.Proxy(graph.placeholder('x'))
+        relu = torch.relu(x)
+        neg = torch.neg(relu)
+        graph.output(neg.node)
+
+        relu.node.target = torch.sigmoid
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [])
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.sigmoid), [relu.node])
+        self.assertEqual(graph.find_nodes(op='call_function'), [relu.node, neg.node])
+
+        neg.node.op = 'call_method'
+        neg.node.target = 'neg'
+        self.assertEqual(graph.find_nodes(op='call_function'), [relu.node])
+        self.assertEqual(graph.find_nodes(op='call_method', target='neg'), [neg.node])
+
+        neg.node.replace_all_uses_with(relu.node)
+        graph.erase_node(neg.node)
+        self.assertEqual(graph.find_nodes(op='call_method'), [])
+        self.assertEqual(len(graph.nodes), 3)
+        graph.lint()
+
+    def test_find_nodes_graph_order(self):
+        graph = torch.fx.Graph()
+        x = torch.fx.Proxy(graph.placeholder('x'))
+        a = torch.relu(x)
+        b = torch.relu(x)
+        c = torch.relu(x)
+        graph.output((a + b + c).node)
+
+        def expected(op, target):
+            return [n for n in graph.nodes if n.op == op and n.target == target]
+
+        # retargeting a node does not move it to the end
+        a.node.target = torch.neg
+        a.node.target = torch.relu
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [a.node, b.node, c.node])
+
+        # moving nodes changes the order they are found in
+        a.node.prepend(c.node)
+        b.node.append(a.node)
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [c.node, b.node, a.node])
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu),
+                         expected('call_function', torch.relu))
+        self.assertEqual(graph.find_nodes(op='call_function'),
+                         [n for n in graph.nodes if n.op == 'call_function'])
+
+    def test_find_nodes_unhashable_target(self):
+        class Unhashable:
+            __name__ = 'unhashable'
+
+            def __eq__(self, other):
+                return isinstance(other, Unhashable)
+
+            def __call__(self, x):
+                return x
+
+        graph = torch.fx.Graph()
+        x = graph.placeholder('x')
+        n = graph.create_node('call_function', Unhashable(), (x,))
+        graph.output(n)
+        self.assertEqual(graph.find_nodes(op='call_function'), [n])
+        self.assertEqual(graph.find_nodes(op='call_function', target=Unhashable()), [n])
+
+        n.target = torch.relu
+        self.assertEqual(graph.find_nodes(op='call_function', target=torch.relu), [n])
+
     def test_find_uses(self):
         graph = torch.fx.Graph()
         x = torch.fx.Proxy(graph.placeholder('x'))
@@ -995,5 +1097,36 @@ class TestFX(JitTestCase):
         z.node.args = (y.node, y.node)
         self.assertEqual(x.node.users.keys(), [zed.node])
 
+    def test_input_nodes(self):
+        graph = torch.fx.Graph()
+        x, y = Proxy(graph.placeholder('x')), Proxy(graph.placeholder('y'))
+        z = x + y
+        zed = torch.cat([z, x, z], dim=0)
+        graph.output(zed.node)
+        graph.lint()
+
+        self.assertEqual(z.node.input_nodes, [x.node, y.node])
+        self.assertEqual(zed.node.input_nodes, [z.node, x.node])
+
+        # input_nodes follows reassignment of args and kwargs
+        zed.node.args = ([y.node, y.node],)
+        self.assertEqual(zed.node.input_nodes, [y.node])
+        zed.node.kwargs = {'out': x.node}
+        self.assertEqual(zed.node.input_nodes, [y.node, x.node])
+
+    def test_walk_arg(self):
+        graph = torch.fx.Graph()
+        x, y = graph.placeholder('x'), graph.placeholder('y')
+        arg = ([x, 3], {'a': (y, slice(None, x))}, 'x')
+
+        visited : List[Node] = []
+        torch.fx.walk_arg(arg, visited.append)
+        self.assertEqual(visited, [x, y, x])
+
+        # walk_arg visits Nodes in the same order that map_arg does
+        mapped : List[Node] = []
+        torch.fx.map_arg(arg, lambda n: mapped.append(n))
+        self.assertEqual(visited, mapped)
+
 if __name__ == '__main__':
     run_tests()
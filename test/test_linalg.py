@@ -2,10 +2,10 @@ import torch
 import unittest
 import itertools
 from math import inf, nan, isnan
-from random import randrange
 
 from torch.testing._internal.common_utils import \
-    (TestCase, run_tests, TEST_NUMPY, IS_MACOS, IS_WINDOWS, TEST_WITH_ASAN, make_tensor)
+    (TestCase, run_tests, TEST_NUMPY, IS_MACOS, IS_WINDOWS, TEST_WITH_ASAN, make_tensor,
+     get_comparison_dtype)
 from torch.testing._internal.common_device_type import \
     (instantiate_device_type_tests, dtypes, skipCUDAIfNoMagma, skipCPUIfNoLapack, precisionOverride)
 from torch.testing._internal.jit_metaprogramming_utils import gen_script_fn_and_args
@@ -14,112 +14,156 @@ from torch.autograd import gradcheck
 if TEST_NUMPY:
     import numpy as np
 
+_ALL_DTYPES = tuple(torch.testing.get_all_dtypes())
+
+# One dtype from each type promotion category (bool, unsigned, signed integer,
+# each floating point width and each complex width) so that type promotion tests
+# cover every result_type class without iterating the full dtype cross product.
+# int8 is included because uint8 and int8 promote to int16, wider than either.
+_PROMOTION_REPRESENTATIVE_DTYPES = (
+    torch.bool, torch.uint8, torch.int8, torch.int32, torch.int64,
+    torch.float16, torch.bfloat16, torch.float32, torch.float64,
+    torch.complex64, torch.complex128)
+
+# Every pair of extreme values, as vectors and as 1x2 and 2x1 matrices
+_EXTREME_PAIRS = tuple(itertools.product([inf, -inf, 0.0, nan, 1.0], repeat=2))
+_EXTREME_VECTORS = [[a, b] for a, b in _EXTREME_PAIRS]
+_EXTREME_MATRICES_1x2 = [[[a, b]] for a, b in _EXTREME_PAIRS]
+_EXTREME_MATRICES_2x1 = [[[a], [b]] for a, b in _EXTREME_PAIRS]
+
+# Every ordered pair of distinct dims of a 4-D tensor
+_DIM4_PAIRS = tuple(itertools.permutations(range(4), 2))
+
+# TorchScript compilation dominates test_autograd_and_jit. The generated script
+# depends only on the non-tensor arguments, which are baked in as constants, so
+# compiled functions are shared by all test cases and dtypes that use the same ones.
+_script_fn_cache = {}
+
+def _get_script_fn(method_name, input, *args):
+    key = (method_name, repr(args))
+    if key not in _script_fn_cache:
+        _script_fn_cache[key], _ = gen_script_fn_and_args(method_name, "functional", input, *args)
+    return _script_fn_cache[key]
+
 class TestLinalg(TestCase):
     exact_dtype = True
 
+    # Compares a tensor to a NumPy reference with a single tensor comparison.
+    # assertEqual treats NumPy arrays as generic iterables and compares them one
+    # element at a time, which dominates the run time of tight test loops. The
+    # default tolerances are the ones that element-wise comparison uses: float32's
+    # for floating point and complex results and exact equality otherwise. Like
+    # in assertEqual, atol is raised to self.precision for those results.
+    def _assert_close_to_numpy(self, result, expected, msg=None, *, rtol=None, atol=None):
+        assert (atol is None) == (rtol is None), "If one of atol or rtol is specified the other must be, too"
+        expected = torch.as_tensor(expected, dtype=result.dtype, device=result.device)
+        self.assertEqual(result.shape, expected.shape, msg=msg)
+        if not (result.dtype.is_floating_point or result.is_complex()):
+            rtol, atol = 0, 0
+        elif rtol is None:
+            rtol, atol = 1.3e-6, max(1e-5, self.precision)
+        else:
+            atol = max(atol, self.precision)
+        compare_dtype = get_comparison_dtype(result, expected)
+        torch.testing.assert_allclose(result.to(compare_dtype), expected.to(compare_dtype),
+                                      rtol=rtol, atol=atol, msg=msg)
+
+    # NumPy does not support bfloat16, so bfloat16 references are computed in double
+    def _to_numpy(self, t):
+        if t.dtype == torch.bfloat16:
+            t = t.to(torch.double)
+        return t.cpu().numpy()
+
     # Tests torch.outer, and its alias, torch.ger, vs. NumPy
     @unittest.skipIf(not TEST_NUMPY, "NumPy not found")
     @precisionOverride({torch.bfloat16: 1e-1})
-    @dtypes(*(torch.testing.get_all_dtypes()))
+    @dtypes(*_ALL_DTYPES)
     def test_outer(self, device, dtype):
-        def run_test_case(a, b):
-            if dtype == torch.bfloat16:
-                a_np = a.to(torch.double).cpu().numpy()
-                b_np = b.to(torch.double).cpu().numpy()
-            else:
-                a_np = a.cpu().numpy()
-                b_np = b.cpu().numpy()
+        def run_test_case(a, b, a_np, b_np):
             expected = np.outer(a_np, b_np)
 
-            self.assertEqual(torch.outer(a, b), expected)
-            self.assertEqual(torch.Tensor.outer(a, b), expected)
+            self._assert_close_to_numpy(torch.outer(a, b), expected)
+            self._assert_close_to_numpy(torch.Tensor.outer(a, b), expected)
 
-            self.assertEqual(torch.ger(a, b), expected)
-            self.assertEqual(torch.Tensor.ger(a, b), expected)
+            self._assert_close_to_numpy(torch.ger(a, b), expected)
+            self._assert_close_to_numpy(torch.Tensor.ger(a, b), expected)
 
             # test out variant
-            out = torch.empty(a.size(0), b.size(0), device=device, dtype=dtype)
-            torch.outer(a, b, out=out)
-            self.assertEqual(out, expected)
+            for op in (torch.outer, torch.ger):
+                out = torch.empty(a.size(0), b.size(0), device=device, dtype=dtype)
+                op(a, b, out=out)
+                self._assert_close_to_numpy(out, expected)
 
-            out = torch.empty(a.size(0), b.size(0), device=device, dtype=dtype)
-            torch.ger(a, b, out=out)
-            self.assertEqual(out, expected)
-
-        a = torch.randn(50).to(device=device, dtype=dtype)
-        b = torch.randn(50).to(device=device, dtype=dtype)
-        run_test_case(a, b)
+        a = make_tensor((50,), device, dtype, low=-2, high=2)
+        b = make_tensor((50,), device, dtype, low=-2, high=2)
+        a_np = self._to_numpy(a)
+        b_np = self._to_numpy(b)
+        run_test_case(a, b, a_np, b_np)
 
         # test 0 strided tensor
-        zero_strided = torch.randn(1).to(device=device, dtype=dtype).expand(50)
-        run_test_case(zero_strided, b)
-        run_test_case(a, zero_strided)
+        zero_strided = make_tensor((1,), device, dtype, low=-2, high=2).expand(50)
+        zero_strided_np = self._to_numpy(zero_strided)
+        run_test_case(zero_strided, b, zero_strided_np, b_np)
+        run_test_case(a, zero_strided, a_np, zero_strided_np)
 
     @unittest.skipIf(not TEST_NUMPY, "NumPy not found")
     @precisionOverride({torch.bfloat16: 1e-1})
-    @dtypes(*(torch.testing.get_all_dtypes()))
+    @dtypes(*_ALL_DTYPES)
     def test_addr(self, device, dtype):
-        def run_test_case(m, a, b, beta=1, alpha=1):
-            if dtype == torch.bfloat16:
-                a_np = a.to(torch.double).cpu().numpy()
-                b_np = b.to(torch.double).cpu().numpy()
-                m_np = m.to(torch.double).cpu().numpy()
-            else:
-                a_np = a.cpu().numpy()
-                b_np = b.cpu().numpy()
-                m_np = m.cpu().numpy()
-
+        def run_test_case(m, a, b, m_np, a_np, b_np, beta=1, alpha=1):
             if beta == 0:
                 expected = alpha * np.outer(a_np, b_np)
             else:
                 expected = beta * m_np + alpha * np.outer(a_np, b_np)
 
-            self.assertEqual(torch.addr(m, a, b, beta=beta, alpha=alpha), expected)
-            self.assertEqual(torch.Tensor.addr(m, a, b, beta=beta, alpha=alpha), expected)
+            result = torch.addr(m, a, b, beta=beta, alpha=alpha)
+            self._assert_close_to_numpy(result, expected)
+            self._assert_close_to_numpy(torch.Tensor.addr(m, a, b, beta=beta, alpha=alpha), expected)
 
-            result_dtype = torch.addr(m, a, b, beta=beta, alpha=alpha).dtype
-            out = torch.empty_like(m, dtype=result_dtype)
+            out = torch.empty_like(m, dtype=result.dtype)
             torch.addr(m, a, b, beta=beta, alpha=alpha, out=out)
-            self.assertEqual(out, expected)
+            self._assert_close_to_numpy(out, expected)
 
-        a = torch.randn(50).to(device=device, dtype=dtype)
-        b = torch.randn(50).to(device=device, dtype=dtype)
-        m = torch.randn(50, 50).to(device=device, dtype=dtype)
+        a = make_tensor((50,), device, dtype, low=-2, high=2)
+        b = make_tensor((50,), device, dtype, low=-2, high=2)
+        m = make_tensor((50, 50), device, dtype, low=-2, high=2)
+        a_np = self._to_numpy(a)
+        b_np = self._to_numpy(b)
+        m_np = self._to_numpy(m)
 
         # when beta is zero
-        run_test_case(m, a, b, beta=0., alpha=2)
+        run_test_case(m, a, b, m_np, a_np, b_np, beta=0., alpha=2)
 
         # when beta is not zero
-        run_test_case(m, a, b, beta=0.5, alpha=2)
+        run_test_case(m, a, b, m_np, a_np, b_np, beta=0.5, alpha=2)
 
         # test transpose
         m_transpose = torch.transpose(m, 0, 1)
-        run_test_case(m_transpose, a, b, beta=0.5, alpha=2)
+        run_test_case(m_transpose, a, b, m_np.T, a_np, b_np, beta=0.5, alpha=2)
 
         # test 0 strided tensor
-        zero_strided = torch.randn(1).to(device=device, dtype=dtype).expand(50)
-        run_test_case(m, zero_strided, b, beta=0.5, alpha=2)
+        zero_strided = make_tensor((1,), device, dtype, low=-2, high=2).expand(50)
+        run_test_case(m, zero_strided, b, m_np, self._to_numpy(zero_strided), b_np, beta=0.5, alpha=2)
 
         # test scalar
         m_scalar = torch.tensor(1, device=device, dtype=dtype)
-        run_test_case(m_scalar, a, b)
+        run_test_case(m_scalar, a, b, self._to_numpy(m_scalar), a_np, b_np)
 
-    @dtypes(*itertools.product(torch.testing.get_all_dtypes(),
-                               torch.testing.get_all_dtypes()))
+    @dtypes(*itertools.product(_PROMOTION_REPRESENTATIVE_DTYPES, repeat=2))
     def test_outer_type_promotion(self, device, dtypes):
-        a = torch.randn(5).to(device=device, dtype=dtypes[0])
-        b = torch.randn(5).to(device=device, dtype=dtypes[1])
+        # Only the result dtype is checked, so the inputs' values don't matter
+        a = torch.empty(1, device=device, dtype=dtypes[0])
+        b = torch.empty(1, device=device, dtype=dtypes[1])
         for op in (torch.outer, torch.Tensor.outer, torch.ger, torch.Tensor.ger):
             result = op(a, b)
             self.assertEqual(result.dtype, torch.result_type(a, b))
 
-    @dtypes(*itertools.product(torch.testing.get_all_dtypes(),
-                               torch.testing.get_all_dtypes()))
+    @dtypes(*itertools.product(_PROMOTION_REPRESENTATIVE_DTYPES, repeat=2))
     def test_addr_type_promotion(self, device, dtypes):
-        a = torch.randn(5).to(device=device, dtype=dtypes[0])
-        b = torch.randn(5).to(device=device, dtype=dtypes[1])
-        m = torch.randn(5, 5).to(device=device,
-                                 dtype=torch.result_type(a, b))
+        # Only the result dtype is checked, so the inputs' values don't matter
+        a = torch.empty(1, device=device, dtype=dtypes[0])
+        b = torch.empty(1, device=device, dtype=dtypes[1])
+        m = torch.empty(1, 1, device=device, dtype=torch.result_type(a, b))
         for op in (torch.addr, torch.Tensor.addr):
             # pass the integer 1 to the torch.result_type as both
             # the default values of alpha and beta are integers (alpha=1, beta=1)
@@ -135,25 +179,21 @@ class TestLinalg(TestCase):
     # 1) test the shape of the result tensor when there is empty input tensor
     # 2) test the Runtime Exception when there is scalar input tensor
     def test_outer_ger_addr_legacy_tests(self, device):
+        # Only shapes and errors are checked, so the inputs are left uninitialized
         for size in ((0, 0), (0, 5), (5, 0)):
-            a = torch.rand(size[0], device=device)
-            b = torch.rand(size[1], device=device)
-
-            self.assertEqual(torch.outer(a, b).shape, size)
-            self.assertEqual(torch.ger(a, b).shape, size)
-
+            a = torch.empty(size[0], device=device)
+            b = torch.empty(size[1], device=device)
             m = torch.empty(size, device=device)
-            self.assertEqual(torch.addr(m, a, b).shape, size)
+            for op, args in ((torch.outer, (a, b)), (torch.ger, (a, b)), (torch.addr, (m, a, b))):
+                self.assertEqual(op(*args).shape, size)
 
-        m = torch.randn(5, 6, device=device)
-        a = torch.randn(5, device=device)
+        m = torch.empty(5, 6, device=device)
+        a = torch.empty(5, device=device)
         b = torch.tensor(6, device=device)
-        self.assertRaises(RuntimeError, lambda: torch.outer(a, b))
-        self.assertRaises(RuntimeError, lambda: torch.outer(b, a))
-        self.assertRaises(RuntimeError, lambda: torch.ger(a, b))
-        self.assertRaises(RuntimeError, lambda: torch.ger(b, a))
-        self.assertRaises(RuntimeError, lambda: torch.addr(m, a, b))
-        self.assertRaises(RuntimeError, lambda: torch.addr(m, b, a))
+        for op, args in ((torch.outer, (a, b)), (torch.outer, (b, a)),
+                         (torch.ger, (a, b)), (torch.ger, (b, a)),
+                         (torch.addr, (m, a, b)), (torch.addr, (m, b, a))):
+            self.assertRaises(RuntimeError, op, *args)
 
     # Tests torch.det and its alias, torch.linalg.det, vs. NumPy
     @skipCUDAIfNoMagma
@@ -196,11 +236,14 @@ class TestLinalg(TestCase):
             self.assertEqual(result_converted.dtype, to_dtype, msg=msg)
             self.assertEqual(result.to(compare_dtype), result_converted.to(compare_dtype), msg=msg)
 
-            result_out_converted = torch.empty_like(result_converted)
+            # The out buffer is reused, and is resized to the shape of the result
+            # so that out= is tested with a correctly sized output, as with empty_like
+            result_out_converted = out_buffers[to_dtype].resize_as_(result_converted)
             torch.linalg.norm(input, ord, keepdim=keepdim, dtype=to_dtype, out=result_out_converted)
             self.assertEqual(result_out_converted.dtype, to_dtype, msg=msg)
             self.assertEqual(result_converted, result_out_converted, msg=msg)
 
+        out_buffers = {dtype: torch.empty(0, dtype=dtype, device=device) for dtype in (torch.float, torch.double)}
         ord_vector = [0, 1, -1, 2, -2, 3, -3, 4.5, -4.5, inf, -inf, None]
         ord_matrix = [1, -1, 2, -2, inf, -inf, None]
         S = 10
@@ -216,19 +259,17 @@ class TestLinalg(TestCase):
                     # double to float
                     run_test_case(input_size, ord, keepdim, torch.double, torch.double, torch.float)
 
-        # Make sure that setting dtype != out.dtype raises an error
+        # Make sure that setting dtype != out.dtype raises an error. This is checked
+        # before ord, dim and keepdim are looked at, so one case per dtype pair suffices.
         dtype_pairs = [
             (torch.float, torch.double),
             (torch.double, torch.float),
         ]
-        for keepdim in [True, False]:
-            for input_size, ord_settings in test_cases:
-                for ord in ord_settings:
-                    for dtype, out_dtype in dtype_pairs:
-                        input = torch.rand(*input_size)
-                        result = torch.Tensor().to(out_dtype)
-                        with self.assertRaisesRegex(RuntimeError, r'provided dtype must match dtype of result'):
-                            torch.linalg.norm(input, ord=ord, keepdim=keepdim, dtype=dtype, out=result)
+        input = torch.rand(S)
+        for dtype, out_dtype in dtype_pairs:
+            result = torch.Tensor().to(out_dtype)
+            with self.assertRaisesRegex(RuntimeError, r'provided dtype must match dtype of result'):
+                torch.linalg.norm(input, dtype=dtype, out=result)
 
         # TODO: Once dtype arg is supported in nuclear and frobenius norms, remove the following test
         #       and  add 'nuc' and 'fro' to ord_matrix above
@@ -242,16 +283,15 @@ class TestLinalg(TestCase):
     @unittest.skipIf(not TEST_NUMPY, "NumPy not found")
     @dtypes(torch.float, torch.double)
     def test_norm_vector(self, device, dtype):
-        def run_test_case(input, p, dim, keepdim):
+        def run_test_case(input, input_numpy, p, dim, keepdim, result_out):
             result = torch.linalg.norm(input, ord, dim, keepdim)
-            input_numpy = input.cpu().numpy()
             result_numpy = np.linalg.norm(input_numpy, ord, dim, keepdim)
 
             msg = f'input.size()={input.size()}, ord={ord}, dim={dim}, keepdim={keepdim}, dtype={dtype}'
-            self.assertEqual(result, result_numpy, msg=msg)
+            self._assert_close_to_numpy(result, result_numpy, msg=msg)
 
-            result_out = torch.empty_like(result)
-            torch.linalg.norm(input, ord, dim, keepdim, out=result_out)
+            # reused out buffer, sized like the result
+            torch.linalg.norm(input, ord, dim, keepdim, out=result_out.resize_as_(result))
             self.assertEqual(result, result_out, msg=msg)
 
         ord_vector = [0, 1, -1, 2, -2, 3, -3, 4.5, -4.5, inf, -inf, None]
@@ -269,11 +309,15 @@ class TestLinalg(TestCase):
         L = 1_000_000
         if dtype == torch.double:
             test_cases.append(((L, ), ord_vector, None))
+        result_out = torch.empty(0, dtype=dtype, device=device)
         for keepdim in [True, False]:
             for input_size, ord_settings, dim in test_cases:
                 input = torch.randn(*input_size, dtype=dtype, device=device)
+                # Copy the input to NumPy once, rather than once per ord, since the
+                # L=1M case would otherwise transfer the same 8MB for every ord
+                input_numpy = input.cpu().numpy()
                 for ord in ord_settings:
-                    run_test_case(input, ord, dim, keepdim)
+                    run_test_case(input, input_numpy, ord, dim, keepdim, result_out)
 
     # This test compares torch.linalg.norm and numpy.linalg.norm to ensure that
     # their matrix norm results match
@@ -281,16 +325,15 @@ class TestLinalg(TestCase):
     @unittest.skipIf(not TEST_NUMPY, "NumPy not found")
     @dtypes(torch.float, torch.double)
     def test_norm_matrix(self, device, dtype):
-        def run_test_case(input, p, dim, keepdim):
+        def run_test_case(input, input_numpy, p, dim, keepdim, result_out):
             result = torch.linalg.norm(input, ord, dim, keepdim)
-            input_numpy = input.cpu().numpy()
             result_numpy = np.linalg.norm(input_numpy, ord, dim, keepdim)
 
             msg = f'input.size()={input.size()}, ord={ord}, dim={dim}, keepdim={keepdim}, dtype={dtype}'
-            self.assertEqual(result, result_numpy, msg=msg)
+            self._assert_close_to_numpy(result, result_numpy, msg=msg)
 
-            result_out = torch.empty_like(result)
-            torch.linalg.norm(input, ord, dim, keepdim, out=result_out)
+            # reused out buffer, sized like the result
+            torch.linalg.norm(input, ord, dim, keepdim, out=result_out.resize_as_(result))
             self.assertEqual(result, result_out, msg=msg)
 
         ord_matrix = [1, -1, 2, -2, inf, -inf, 'nuc', 'fro', None]
@@ -308,11 +351,13 @@ class TestLinalg(TestCase):
         L = 1_000
         if dtype == torch.double:
             test_cases.append(((L, L), ord_matrix, None))
+        result_out = torch.empty(0, dtype=dtype, device=device)
         for keepdim in [True, False]:
             for input_size, ord_settings, dim in test_cases:
                 input = torch.randn(*input_size, dtype=dtype, device=device)
+                input_numpy = input.cpu().numpy()
                 for ord in ord_settings:
-                    run_test_case(input, ord, dim, keepdim)
+                    run_test_case(input, input_numpy, ord, dim, keepdim, result_out)
 
     # Test autograd and jit functionality for linalg functions.
     # TODO: Once support for linalg functions is added to method_tests in common_methods_invocations.py,
@@ -320,6 +365,19 @@ class TestLinalg(TestCase):
     #       so they should work with minimal changes.
     @dtypes(torch.float, torch.double)
     def test_autograd_and_jit(self, device, dtype):
+        # The 1, inf and -inf norms have piecewise constant gradients: the sign
+        # of the elements that attain the norm and zero elsewhere. For matrices,
+        # those are the elements of the column (for ord=1) or row (for ord=+-inf)
+        # with the largest or smallest absolute sum.
+        def piecewise_constant_norm_grad(x, ord):
+            reduce_fn = torch.min if ord == -inf else torch.max
+            if x.dim() == 1:
+                if ord == 1:
+                    return x.sign()
+                return x.sign() * (x.abs() == reduce_fn(x.abs()))
+            abs_sums = x.abs().sum(0 if ord == 1 else 1, keepdim=True)
+            return x.sign() * (abs_sums == reduce_fn(abs_sums))
+
         torch.manual_seed(0)
         S = 10
         NO_ARGS = None  # NOTE: refer to common_methods_invocations.py if you need this feature
@@ -348,8 +406,8 @@ class TestLinalg(TestCase):
             ('norm', (S,), (-inf,), 'vector_neg_inf'),
             ('norm', (S,), (-3.5,), 'vector_neg_3_5'),
             ('norm', (S,), (-0.5,), 'vector_neg_0_5'),
-            ('norm', (S,), (2,), 'vector_neg_2'),
-            ('norm', (S,), (1,), 'vector_neg_1'),
+            ('norm', (S,), (-2,), 'vector_neg_2'),
+            ('norm', (S,), (-1,), 'vector_neg_1'),
             ('norm', (S, S), (inf,), 'matrix_inf'),
             ('norm', (S, S), (2,), 'matrix_2', (), NO_ARGS, [skipCPUIfNoLapack, skipCUDAIfNoMagma]),
             ('norm', (S, S), (1,), 'matrix_1'),
@@ -385,7 +443,7 @@ class TestLinalg(TestCase):
             # Test JIT
             input = torch.randn(*input_size, dtype=dtype, device=device)
             input_script = input.clone().detach()
-            script_method, tensors = gen_script_fn_and_args("linalg.norm", "functional", input_script, *args)
+            script_method = _get_script_fn("linalg.norm", input_script, *args)
             self.assertEqual(
                 func(input, *args),
                 script_method(input_script),
@@ -398,7 +456,15 @@ class TestLinalg(TestCase):
 
                 def run_func(input):
                     return func(input, *args)
-                self.assertTrue(gradcheck(run_func, input), msg=msg)
+
+                # Numerical Jacobian estimation adds nothing over the closed
+                # form for norms whose gradient is piecewise constant
+                if args in ([1], [inf], [-inf]):
+                    run_func(input).backward()
+                    expected_grad = piecewise_constant_norm_grad(input.detach(), args[0])
+                    self.assertEqual(input.grad, expected_grad, msg=msg)
+                else:
+                    self.assertTrue(gradcheck(run_func, input), msg=msg)
 
     # This test calls torch.linalg.norm and numpy.linalg.norm with illegal arguments
     # to ensure that they both throw errors
@@ -491,8 +557,7 @@ class TestLinalg(TestCase):
                 res = torch.linalg.norm(x, ord, keepdim=keepdim).cpu()
                 expected = np.linalg.norm(xn, ord, keepdims=keepdim)
                 msg = gen_error_message(x.size(), ord, keepdim)
-                self.assertEqual(res.shape, expected.shape, msg=msg)
-                self.assertEqual(res, expected, msg=msg)
+                self._assert_close_to_numpy(res, expected, msg=msg)
 
             # matrix norm
             x = torch.randn(25, 25, device=device, dtype=dtype)
@@ -505,8 +570,7 @@ class TestLinalg(TestCase):
                 res = torch.linalg.norm(x, ord, keepdim=keepdim).cpu()
                 expected = np.linalg.norm(xn, ord, keepdims=keepdim)
                 msg = gen_error_message(x.size(), ord, keepdim)
-                self.assertEqual(res.shape, expected.shape, msg=msg)
-                self.assertEqual(res, expected, msg=msg)
+                self._assert_close_to_numpy(res, expected, msg=msg)
 
         # Test unsupported ords
         # vector norm
@@ -531,20 +595,16 @@ class TestLinalg(TestCase):
     def test_norm_extreme_values(self, device):
         vector_ords = [0, 1, 2, 3, inf, -1, -2, -3, -inf]
         matrix_ords = ['fro', 'nuc', 1, 2, inf, -1, -2, -inf]
-        vectors = []
-        matrices = []
-        for pair in itertools.product([inf, -inf, 0.0, nan, 1.0], repeat=2):
-            vectors.append(list(pair))
-            matrices.append([[pair[0], pair[1]]])
-            matrices.append([[pair[0]], [pair[1]]])
-        for vector in vectors:
-            x = torch.tensor(vector).to(device)
-            x_n = x.cpu().numpy()
-            for ord in vector_ords:
-                msg = f'ord={ord}, vector={vector}'
-                result = torch.linalg.norm(x, ord=ord)
-                result_n = np.linalg.norm(x_n, ord=ord)
-                self.assertEqual(result, result_n, msg=msg)
+
+        # All the vectors are stacked into one batch so that each ord is
+        # computed with a single call instead of one call per vector
+        x_n = np.array(_EXTREME_VECTORS, dtype=np.float32)
+        x = torch.from_numpy(x_n).to(device, non_blocking=True)
+        for ord in vector_ords:
+            msg = f'ord={ord}, vectors={_EXTREME_VECTORS}'
+            result = torch.linalg.norm(x, ord=ord, dim=-1)
+            result_n = np.linalg.norm(x_n, ord=ord, axis=-1)
+            self._assert_close_to_numpy(result, result_n, msg=msg)
 
         # TODO: Remove this function once the broken cases are fixed
         def is_broken_matrix_norm_case(ord, x):
@@ -556,18 +616,16 @@ class TestLinalg(TestCase):
                         return True
             return False
 
-        for matrix in matrices:
-            x = torch.tensor(matrix).to(device)
-            x_n = x.cpu().numpy()
+        for matrices in [_EXTREME_MATRICES_1x2, _EXTREME_MATRICES_2x1]:
+            x_n = np.array(matrices, dtype=np.float32)
+            x = torch.from_numpy(x_n).to(device, non_blocking=True)
             for ord in matrix_ords:
-                msg = f'ord={ord}, matrix={matrix}'
-                result = torch.linalg.norm(x, ord=ord)
-                result_n = np.linalg.norm(x_n, ord=ord)
+                msg = f'ord={ord}, matrices={matrices}'
+                result = torch.linalg.norm(x, ord=ord, dim=(-2, -1))
+                result_n = np.linalg.norm(x_n, ord=ord, axis=(-2, -1))
 
-                if is_broken_matrix_norm_case(ord, x):
-                    continue
-                else:
-                    self.assertEqual(result, result_n, msg=msg)
+                not_broken = [not is_broken_matrix_norm_case(ord, matrix) for matrix in x]
+                self._assert_close_to_numpy(result[not_broken], result_n[not_broken], msg=msg)
 
     # Test degenerate shape results match numpy for linalg.norm vector norms
     @skipCUDAIfNoMagma
@@ -575,9 +633,8 @@ class TestLinalg(TestCase):
     @unittest.skipIf(TEST_WITH_ASAN, "Skipped on ASAN since it checks for undefined behavior.")
     @dtypes(torch.float, torch.double, torch.cfloat, torch.cdouble)
     def test_norm_vector_degenerate_shapes(self, device, dtype):
-        def run_test_case(input, ord, dim, keepdim, should_error):
+        def run_test_case(input, input_numpy, ord, dim, keepdim, should_error):
             msg = f'input.size()={input.size()}, ord={ord}, dim={dim}, keepdim={keepdim}, dtype={dtype}'
-            input_numpy = input.cpu().numpy()
             if should_error:
                 with self.assertRaises(ValueError):
                     np.linalg.norm(input_numpy, ord, dim, keepdim)
@@ -592,7 +649,7 @@ class TestLinalg(TestCase):
                     return
                 result_numpy = np.linalg.norm(input_numpy, ord, dim, keepdim)
                 result = torch.linalg.norm(input, ord, dim, keepdim)
-                self.assertEqual(result, result_numpy, msg=msg)
+                self._assert_close_to_numpy(result, result_numpy, msg=msg)
 
         ord_vector = [0, 0.5, 1, 2, 3, inf, -0.5, -1, -2, -3, -inf, None]
         S = 10
@@ -607,8 +664,9 @@ class TestLinalg(TestCase):
         for keepdim in [True, False]:
             for input_size, error_ords, dim in test_cases:
                 input = torch.randn(*input_size, dtype=dtype, device=device)
+                input_numpy = input.cpu().numpy()
                 for ord in ord_vector:
-                    run_test_case(input, ord, dim, keepdim, ord in error_ords)
+                    run_test_case(input, input_numpy, ord, dim, keepdim, ord in error_ords)
 
     # Test degenerate shape results match numpy for linalg.norm matrix norms
     @skipCUDAIfNoMagma
@@ -616,7 +674,7 @@ class TestLinalg(TestCase):
     @unittest.skipIf(not TEST_NUMPY, "Numpy not found")
     @dtypes(torch.float, torch.double, torch.cfloat, torch.cdouble)
     def test_norm_matrix_degenerate_shapes(self, device, dtype):
-        def run_test_case(input, ord, dim, keepdim, should_error):
+        def run_test_case(input, input_numpy, ord, dim, keepdim, should_error):
             if dtype in [torch.cfloat, torch.cdouble] and ord in ['fro', None]:
                 # TODO: Once these ord values have support for complex numbers,
                 #       remove this error test case
@@ -624,7 +682,6 @@ class TestLinalg(TestCase):
                     torch.linalg.norm(input, ord, dim, keepdim)
                 return
             msg = f'input.size()={input.size()}, ord={ord}, dim={dim}, keepdim={keepdim}, dtype={dtype}'
-            input_numpy = input.cpu().numpy()
             if should_error:
                 with self.assertRaises(ValueError):
                     np.linalg.norm(input_numpy, ord, dim, keepdim)
@@ -633,9 +690,9 @@ class TestLinalg(TestCase):
             else:
                 result_numpy = np.linalg.norm(input_numpy, ord, dim, keepdim)
                 result = torch.linalg.norm(input, ord, dim, keepdim)
-                self.assertEqual(result, result_numpy, msg=msg)
+                self._assert_close_to_numpy(result, result_numpy, msg=msg)
 
-        ord_matrix = ['fro', 'nuc', 1, 2, inf, -1, -2, -inf, None]
+        ord_matrix = [1, -1, 2, -2, inf, -inf, 'nuc', 'fro', None]
         S = 10
         test_cases = [
             # input size, p settings that cause error, dim
@@ -650,8 +707,9 @@ class TestLinalg(TestCase):
         for keepdim in [True, False]:
             for input_size, error_ords, dim in test_cases:
                 input = torch.randn(*input_size, dtype=dtype, device=device)
+                input_numpy = input.cpu().numpy()
                 for ord in ord_matrix:
-                    run_test_case(input, ord, dim, keepdim, ord in error_ords)
+                    run_test_case(input, input_numpy, ord, dim, keepdim, ord in error_ords)
 
     def test_norm_fastpaths(self, device):
         x = torch.randn(3, 5, device=device)
@@ -663,7 +721,7 @@ class TestLinalg(TestCase):
 
         # fast 0-norm
         result = torch.linalg.norm(x, 0, 1)
-        expected = (x != 0).type_as(x).sum(1)
+        expected = torch.count_nonzero(x, dim=1).to(x.dtype)
         self.assertEqual(result, expected)
 
         # fast 1-norm
@@ -673,12 +731,21 @@ class TestLinalg(TestCase):
 
         # fast 2-norm
         result = torch.linalg.norm(x, 2, 1)
-        expected = torch.sqrt(x.pow(2).sum(1))
+        expected = torch.sqrt((x * x).sum(1))
         self.assertEqual(result, expected)
 
+        # fast 2-norm of large contiguous inputs, so that the vectorized
+        # reduction is exercised and not just its scalar remainder loop,
+        # both along the innermost dim and across many short rows
+        for size in [(4, 100000), (100000, 3)]:
+            x_large = torch.randn(size, device=device)
+            result = torch.linalg.norm(x_large, 2, 1)
+            expected = torch.sqrt((x_large * x_large).sum(1))
+            self.assertEqual(result, expected, rtol=1e-5, atol=1e-5)
+
         # fast 3-norm
         result = torch.linalg.norm(x, 3, 1)
-        expected = torch.pow(x.pow(3).abs().sum(1), 1.0 / 3.0)
+        expected = torch.pow((x * x * x).abs().sum(1), 1.0 / 3.0)
         self.assertEqual(result, expected)
 
     @skipCUDAIfNoMagma
@@ -689,42 +756,42 @@ class TestLinalg(TestCase):
             return "norm failed for input size %s, p=%s, keepdim=%s, dim=%s" % (
                 input_size, p, keepdim, dim)
 
+        # The inputs are shared by both keepdim settings, so they are only
+        # created and copied to NumPy once
+        input_sizes = [(25,), (25, 25), (), (5, 6, 7, 8)]
+        inputs = {size: torch.randn(size, device=device) for size in input_sizes}
+        inputs_numpy = {size: x.cpu().numpy() for size, x in inputs.items()}
+
         for keepdim in [False, True]:
             # full reduction
-            x = torch.randn(25, device=device)
-            xn = x.cpu().numpy()
+            x, xn = inputs[(25,)], inputs_numpy[(25,)]
             for p in [0, 1, 2, 3, 4, inf, -inf, -1, -2, -3, 1.5]:
                 res = x.norm(p, keepdim=keepdim).cpu()
                 expected = np.linalg.norm(xn, p, keepdims=keepdim)
-                self.assertEqual(res, expected, atol=1e-5, rtol=0, msg=gen_error_message(x.size(), p, keepdim))
+                self._assert_close_to_numpy(res, expected, atol=1e-5, rtol=0, msg=gen_error_message(x.size(), p, keepdim))
 
             # one dimension
-            x = torch.randn(25, 25, device=device)
-            xn = x.cpu().numpy()
+            x, xn = inputs[(25, 25)], inputs_numpy[(25, 25)]
             for p in [0, 1, 2, 3, 4, inf, -inf, -1, -2, -3]:
                 dim = 1
                 res = x.norm(p, dim, keepdim=keepdim).cpu()
                 expected = np.linalg.norm(xn, p, dim, keepdims=keepdim)
                 msg = gen_error_message(x.size(), p, keepdim, dim)
-                self.assertEqual(res.shape, expected.shape, msg=msg)
-                self.assertEqual(res, expected, msg=msg)
+                self._assert_close_to_numpy(res, expected, msg=msg)
 
             # matrix norm
             for p in ['fro', 'nuc']:
                 res = x.norm(p, keepdim=keepdim).cpu()
                 expected = np.linalg.norm(xn, p, keepdims=keepdim)
                 msg = gen_error_message(x.size(), p, keepdim)
-                self.assertEqual(res.shape, expected.shape, msg=msg)
-                self.assertEqual(res, expected, msg=msg)
+                self._assert_close_to_numpy(res, expected, msg=msg)
 
             # zero dimensions
-            x = torch.randn((), device=device)
-            xn = x.cpu().numpy()
+            x, xn = inputs[()], inputs_numpy[()]
             res = x.norm(keepdim=keepdim).cpu()
             expected = np.linalg.norm(xn, keepdims=keepdim)
             msg = gen_error_message(x.size(), None, keepdim)
-            self.assertEqual(res.shape, expected.shape, msg=msg)
-            self.assertEqual(res, expected, msg=msg)
+            self._assert_close_to_numpy(res, expected, msg=msg)
 
             # larger tensor sanity check
             self.assertEqual(
@@ -732,17 +799,13 @@ class TestLinalg(TestCase):
                 torch.norm(torch.ones(40000), keepdim=keepdim))
 
             # matrix norm with non-square >2-D tensors, all combinations of reduction dims
-            x = torch.randn(5, 6, 7, 8, device=device)
-            xn = x.cpu().numpy()
+            x, xn = inputs[(5, 6, 7, 8)], inputs_numpy[(5, 6, 7, 8)]
             for p in ['fro', 'nuc']:
-                for dim in itertools.product(*[list(range(4))] * 2):
-                    if dim[0] == dim[1]:
-                        continue
+                for dim in _DIM4_PAIRS:
                     res = x.norm(p=p, dim=dim, keepdim=keepdim).cpu()
                     expected = np.linalg.norm(xn, ord=p, axis=dim, keepdims=keepdim)
                     msg = gen_error_message(x.size(), p, keepdim, dim)
-                    self.assertEqual(res.shape, expected.shape, msg=msg)
-                    self.assertEqual(res, expected, msg=msg)
+                    self._assert_close_to_numpy(res, expected, msg=msg)
 
     @skipCUDAIfNoMagma
     @skipCPUIfNoLapack
@@ -761,8 +824,7 @@ class TestLinalg(TestCase):
                     res = x.norm(p, keepdim=keepdim).cpu()
                     expected = np.linalg.norm(xn, p, keepdims=keepdim)
                     msg = gen_error_message(x.size(), p, keepdim)
-                    self.assertEqual(res.shape, expected.shape, msg=msg)
-                    self.assertEqual(res, expected, msg=msg)
+                    self._assert_close_to_numpy(res, expected, msg=msg)
 
                 # matrix norm
                 x = torch.randn(25, 25, device=device) + 1j * torch.randn(25, 25, device=device)
@@ -771,8 +833,7 @@ class TestLinalg(TestCase):
                     res = x.norm(p, keepdim=keepdim).cpu()
                     expected = np.linalg.norm(xn, p, keepdims=keepdim)
                     msg = gen_error_message(x.size(), p, keepdim)
-                    self.assertEqual(res.shape, expected.shape, msg=msg)
-                    self.assertEqual(res, expected, msg=msg)
+                    self._assert_close_to_numpy(res, expected, msg=msg)
 
             # TODO: remove error test and add functionality test above when 2-norm support is added
             with self.assertRaisesRegex(RuntimeError, r'norm with p=2 not supported for complex tensors'):
@@ -808,23 +869,18 @@ class TestLinalg(TestCase):
         for input_size in input_sizes:
             a = make_tensor(input_size, device, dtype, low=-9, high=9)
 
+            nd = a.dim()
+
             # Try full reduction
             dim_settings = [None]
 
             # Try all possible 1-D reductions
-            dim_settings += list(range(-a.dim(), a.dim()))
+            dim_settings += list(range(-nd, nd))
 
-            def wrap_dim(dim, ndims):
-                assert (dim < ndims) and (dim >= -ndims)
-                if dim >= 0:
-                    return dim
-                else:
-                    return dim + ndims
-
-            # Try all possible 2-D reductions
+            # Try all possible 2-D reductions, skipping pairs that wrap to the same dim
             dim_settings += [
-                (d0, d1) for d0, d1 in itertools.combinations(range(-a.dim(), a.dim()), 2)
-                if wrap_dim(d0, a.dim()) != wrap_dim(d1, a.dim())]
+                (d0, d1) for d0, d1 in itertools.combinations(range(-nd, nd), 2)
+                if d0 % nd != d1 % nd]
 
             for dim in dim_settings:
                 for keepdim in [True, False]:
@@ -835,24 +891,27 @@ class TestLinalg(TestCase):
     @skipCUDAIfNoMagma
     @unittest.skipIf(not TEST_NUMPY, "Numpy not found")
     def test_nuclear_norm_axes_small_brute_force_old(self, device):
+        # Off the CPU only every 20th case is checked, because of the many
+        # cpu <==> device copies. A counter instead of random sampling makes
+        # the checked cases, and the test's run time, deterministic.
+        num_checks = itertools.count()
+
         def check_single_nuclear_norm(x, axes):
-            if self.device_type != 'cpu' and randrange(100) < 95:
-                return  # too many cpu <==> device copies
+            if self.device_type != 'cpu' and next(num_checks) % 20 != 0:
+                return
 
             a = np.array(x.cpu(), copy=False)
             expected = np.linalg.norm(a, "nuc", axis=axes)
 
             ans = torch.norm(x, "nuc", dim=axes)
             self.assertTrue(ans.is_contiguous())
-            self.assertEqual(ans.shape, expected.shape)
-            self.assertEqual(ans.cpu(), expected, rtol=1e-02, atol=1e-03, equal_nan=True)
+            self._assert_close_to_numpy(ans, expected, rtol=1e-02, atol=1e-03)
 
             out = torch.zeros(expected.shape, dtype=x.dtype, device=x.device)
             ans = torch.norm(x, "nuc", dim=axes, out=out)
             self.assertIs(ans, out)
             self.assertTrue(ans.is_contiguous())
-            self.assertEqual(ans.shape, expected.shape)
-            self.assertEqual(ans.cpu(), expected, rtol=1e-02, atol=1e-03, equal_nan=True)
+            self._assert_close_to_numpy(ans, expected, rtol=1e-02, atol=1e-03)
 
         for n in range(1, 3):
             for m in range(1, 3):
@@ -892,7 +951,7 @@ class TestLinalg(TestCase):
                         check_single_nuclear_norm(x, axes)
 
                     for r in range(1, 3):
-                        for axes in itertools.permutations([0, 1, 2, 3], 2):
+                        for axes in _DIM4_PAIRS:
                             # 4d, inner dimensions C
                             x = torch.randn(r, o, n, m, device=device)
                             check_single_nuclear_norm(x, axes)
@@ -1,9 +1,9 @@
 from tools.codegen.model import *
 from tools.codegen.api.types import TensorOptionsArguments, CppArgument, ThisArgument
 import tools.codegen.local as local
-from typing import Optional, Sequence, Union, Callable, List, Tuple
-import copy
-from dataclasses import dataclass
+import re
+from typing import Optional, Sequence, Union, List, Tuple, Match
+from dataclasses import dataclass, field
 
 # This file describes the translation of JIT schema to the public C++
 # API, which is what people use when they call functions like at::add.
@@ -58,7 +58,7 @@ def valuetype_type(t: Type) -> Optional[str]:
             return None
         return f"c10::optional<{elem}>"
     elif isinstance(t, ListType):
-        if str(t.elem) == 'bool':
+        if isinstance(t.elem, BaseType) and t.elem.name is BaseTy.bool:
             assert t.size is not None
             return f"std::array<bool,{t.size}>"
         else:
@@ -82,7 +82,7 @@ def argumenttype_type(t: Type, *, mutable: bool) -> str:
         else:
             raise AssertionError(f"base type should have been value type {t}")
     elif isinstance(t, OptionalType):
-        if str(t.elem) == 'Tensor':
+        if isinstance(t.elem, BaseType) and t.elem.name is BaseTy.Tensor:
             if mutable:
                 return 'Tensor &'  # TODO: fix this discrepancy
             else:
@@ -94,14 +94,17 @@ def argumenttype_type(t: Type, *, mutable: bool) -> str:
         return f"c10::optional<{elem}>"
     elif isinstance(t, ListType):
         # TODO: remove these special cases, ArrayRef fallthrough works fine
-        if str(t.elem) == 'int':
-            return "IntArrayRef"
-        elif str(t.elem) == 'Tensor':
-            return "TensorList"
-        elif str(t.elem) == 'Dimname':
-            return "DimnameList"
+        if isinstance(t.elem, BaseType):
+            if t.elem.name is BaseTy.int:
+                return "IntArrayRef"
+            elif t.elem.name is BaseTy.Tensor:
+                return "TensorList"
+            elif t.elem.name is BaseTy.Dimname:
+                return "DimnameList"
         # TODO: do something reasonable about lists of optional tensors
-        elif (not local.use_c10_dispatcher().dispatcher_uses_new_style()) and str(t.elem) == 'Tensor?':
+        elif (not local.use_c10_dispatcher().dispatcher_uses_new_style()) and \
+                isinstance(t.elem, OptionalType) and \
+                isinstance(t.elem.elem, BaseType) and t.elem.elem.name is BaseTy.Tensor:
             return "TensorList"
         elem = argumenttype_type(t.elem, mutable=mutable)
         # TODO: explicitly qualify namespace here
@@ -156,33 +159,34 @@ JIT_TO_CPP_DEFAULT = {
     'long': 'at::kLong',
 }
 
+# Escapes in a single-quoted schema string that must change in the
+# double-quoted C++ literal: an escaped single quote no longer needs its
+# backslash and a bare double quote needs one.  Other escapes are kept.
+STR_DEFAULT_ESCAPE = re.compile(r'\\.|"', re.DOTALL)
+
+def _str_default_escape(m: Match[str]) -> str:
+    c = m.group(0)
+    if c == "\\'":
+        return "'"
+    elif c == '"':
+        return '\\"'
+    else:
+        return c
+
 # Convert a JIT default into C++ expression representing the default
 def default_expr(d: str, t: Type) -> str:
-    if d == 'None' and str(t) == 'Tensor?':
-        return '{}'
-    if isinstance(t, BaseType) and t.name is BaseTy.str:
-        # Schema allows single quotes but C++ needs double
-        if len(d) >= 2 and d[0] == "'" and d[-1] == "'":
-            s = ''
-            i = 1
-            while i + 1 < len(d):
-                if d[i] != '\\':
-                    if d[i] == '"':
-                        s += '\\"'
-                    else:
-                        s += d[i]
-                    i += 1
-                else:
-                    if d[i + 1] == "'":
-                        s += "'"
-                    else:
-                        s += d[i:i + 2]
-                    i += 2
-
-            return f'"{s}"'
+    if isinstance(t, BaseType):
+        if t.name is BaseTy.str:
+            # Schema allows single quotes but C++ needs double
+            if len(d) >= 2 and d[0] == "'" and d[-1] == "'":
+                s = STR_DEFAULT_ESCAPE.sub(_str_default_escape, d[1:-1])
+                return f'"{s}"'
+        return JIT_TO_CPP_DEFAULT.get(d, d)
 
     if isinstance(t, OptionalType):
         if d == 'None':
+            if isinstance(t.elem, BaseType) and t.elem.name is BaseTy.Tensor:
+                return '{}'
             return 'c10::nullopt'
 
         return default_expr(d, t.elem)
@@ -232,13 +236,26 @@ class CppSignature:
     returns: Tuple[Return, ...]
     arguments: Tuple[Union[Argument, TensorOptionsArguments, ThisArgument], ...]
 
+    # Lazily computed C++ form of arguments.  A signature is usually rendered
+    # several times (with and without defaults, declaration and definition),
+    # so the translation is only done once per signature.
+    _cpp_arguments: Optional[Tuple[CppArgument, ...]] = field(
+        default=None, init=False, repr=False, compare=False)
+
+    def _cached_cpp_arguments(self) -> Tuple[CppArgument, ...]:
+        if self._cpp_arguments is None:
+            # The dataclass is frozen, so bypass its __setattr__
+            object.__setattr__(self, '_cpp_arguments', tuple(map(argument, self.arguments)))
+        assert self._cpp_arguments is not None
+        return self._cpp_arguments
+
     def cpp_arguments(self) -> Sequence[CppArgument]:
-        return list(map(argument, self.arguments))
+        return list(self._cached_cpp_arguments())
 
     # Return arguments as a comma separated list, i.e. like they would be in a C++
     # function signature. Include default values for arguments.
     def cpp_arguments_str(self, with_defaults: bool) -> str:
-        args_without_this = [argument(a) for a in self.arguments if not isinstance(a, ThisArgument)]
+        args_without_this = [a for a in self._cached_cpp_arguments() if not isinstance(a.argument, ThisArgument)]
         if with_defaults:
             return ', '.join(map(str, args_without_this))
         else:
@@ -268,59 +285,65 @@ class CppSignatureGroup:
             return self.signature
 
 
+# Name and accepted types of each argument that is grouped into
+# TensorOptions, in the order they must appear.  The types are parsed
+# once, not once per op.
+TENSOR_OPTIONS_PATTERN: Tuple[Tuple[str, Tuple[Type, ...]], ...] = tuple(
+    (name, (ty, OptionalType(ty))) for name, ty in [
+        ('dtype', Type.parse('ScalarType')),
+        ('layout', Type.parse('Layout')),
+        ('device', Type.parse('Device')),
+        ('pin_memory', Type.parse('bool')),
+    ]
+)
+
 def signature_group(
     func: FunctionSchema, *, method: bool = False,
 ) -> CppSignatureGroup:
-    args: List[Union[Argument, ThisArgument, TensorOptionsArguments]] = []
-    args.extend(func.out_arguments)
-
+    # The positional arguments are shared by both signatures, so they are
+    # gathered once and the kwarg-only arguments are appended to them.
+    positional_args: List[Union[Argument, ThisArgument, TensorOptionsArguments]] = list(func.out_arguments)
     if method:
-        args.extend(ThisArgument(a) if a.name == "self" else a for a in func.arguments)
+        positional_args.extend(ThisArgument(a) if a.name == "self" else a for a in func.arguments)
     else:
-        args.extend(func.arguments)
-
-    gathered_args = copy.deepcopy(args)
-
-    # group up arguments for tensor options
-    def pred(name: str, ty: Type) -> Callable[[Argument], bool]:
-        return lambda a: a.name == name and a.type in [ty, OptionalType(ty)]
-    predicates = [  # order matters
-        pred('dtype', Type.parse('ScalarType')),
-        pred('layout', Type.parse('Layout')),
-        pred('device', Type.parse('Device')),
-        pred('pin_memory', Type.parse('bool')),
-    ]
+        positional_args.extend(func.arguments)
+    args = tuple(positional_args)
+
+    signature = CppSignature(arguments=args + func.kwarg_only_arguments, returns=func.returns)
 
+    # Too few kwarg-only arguments to contain a TensorOptions group.
+    if len(func.kwarg_only_arguments) < len(TENSOR_OPTIONS_PATTERN):
+        return CppSignatureGroup(signature=signature, gathered_signature=None)
+
+    # Only the kwarg-only arguments can differ between the two signatures,
+    # so only they are gathered here.  All arguments are frozen dataclasses,
+    # so the signatures can share them without copying.
+    gathered_kwarg_only_args: List[Union[Argument, ThisArgument, TensorOptionsArguments]] = []
     has_tensoroptions_argument = False
     i = 0
     while i < len(func.kwarg_only_arguments):
         # If there is enough space...
-        if i <= len(func.kwarg_only_arguments) - len(predicates):
-            # And the next len(predicates) arguments look like TensorOptions arguments
-            if all(p(a) for p, a in zip(predicates, func.kwarg_only_arguments[i : i + len(predicates)])):
+        if i <= len(func.kwarg_only_arguments) - len(TENSOR_OPTIONS_PATTERN):
+            # And the next len(TENSOR_OPTIONS_PATTERN) arguments look like TensorOptions arguments
+            window = func.kwarg_only_arguments[i : i + len(TENSOR_OPTIONS_PATTERN)]
+            if all(a.name == name and a.type in types for (name, types), a in zip(TENSOR_OPTIONS_PATTERN, window)):
                 has_tensoroptions_argument = True
                 # Group them together as one argument
-                gathered_args.append(TensorOptionsArguments(
+                gathered_kwarg_only_args.append(TensorOptionsArguments(
                     dtype=func.kwarg_only_arguments[i],
                     layout=func.kwarg_only_arguments[i + 1],
                     device=func.kwarg_only_arguments[i + 2],
                     pin_memory=func.kwarg_only_arguments[i + 3],
                 ))
-                i += len(predicates)
+                i += len(TENSOR_OPTIONS_PATTERN)
                 continue
-        gathered_args.append(func.kwarg_only_arguments[i])
+        gathered_kwarg_only_args.append(func.kwarg_only_arguments[i])
         i += 1
 
-    args.extend(func.kwarg_only_arguments)
-
     if has_tensoroptions_argument:
         return CppSignatureGroup(
-            signature=CppSignature(arguments=tuple(args), returns=tuple(func.returns)),
-            gathered_signature=CppSignature(arguments=tuple(gathered_args), returns=tuple(func.returns)),
+            signature=signature,
+            gathered_signature=CppSignature(arguments=args + tuple(gathered_kwarg_only_args), returns=func.returns),
         )
     else:
-        assert gathered_args == args
-        return CppSignatureGroup(
-            signature=CppSignature(arguments=tuple(args), returns=tuple(func.returns)),
-            gathered_signature=None,
-        )
+        return CppSignatureGroup(signature=signature, gathered_signature=None)
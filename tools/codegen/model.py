@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Optional, Iterator, Tuple, Set, NoReturn
 from enum import Enum
 import itertools
+import functools
 
 # A little trick from https://github.com/python/mypy/issues/6366
 # for getting mypy to do exhaustiveness checking
@@ -481,7 +482,10 @@ class Annotation:
 # of the subclasses.  If Python had ADTs this would be one!
 @dataclass(frozen=True)
 class Type:
+    # Types are immutable and the same type strings occur in many schemas,
+    # so parse results are shared
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def parse(t: str) -> 'Type':
         r = Type._parse(t)
         assert str(r) == t, f'{r} != {t}'
@@ -86,5 +86,5 @@ Because this code is valid PyTorch code, the resulting `GraphModule` can be used
 from .graph_module import GraphModule
 from .symbolic_trace import symbolic_trace, Tracer
 from .graph import Graph
-from .node import Node, map_arg
+from .node import Node, map_arg, walk_arg
 from .proxy import Proxy
@@ -1,6 +1,6 @@
-from .node import Node, Argument, Target, map_arg
+from .node import Node, Argument, Target, map_arg, walk_arg
 
-from typing import Callable, Any, List, Dict, Optional, Tuple, Set
+from typing import Callable, Any, List, Dict, Iterable, Optional, Tuple, Set
 import builtins
 import torch
 import types
@@ -13,6 +13,13 @@ def _shadows_builtin_name(name: str) -> bool:
 def _is_magic(x: str) -> bool:
     return x.startswith('__') and x.endswith('__')
 
+def _is_hashable(x: Any) -> bool:
+    try:
+        hash(x)
+    except TypeError:
+        return False
+    return True
+
 def snake_case(s: str) -> str:
     return ''.join(['_' + i.lower() if i.isupper() else i for i in s]).lstrip('_')
 
@@ -97,12 +104,21 @@ class _node_list:
         return self.graph._len
 
     def __iter__(self):
-        root, direction = self.graph._root, self.direction
-        cur = getattr(root, direction)
-        while cur is not root:
-            if not cur._erased:
-                yield cur
-            cur = getattr(cur, direction)
+        # Each direction gets its own loop so that the links are followed with
+        # plain attribute loads rather than a getattr call per node
+        root = self.graph._root
+        if self.direction == '_next':
+            cur = root._next
+            while cur is not root:
+                if not cur._erased:
+                    yield cur
+                cur = cur._next
+        else:
+            cur = root._prev
+            while cur is not root:
+                if not cur._erased:
+                    yield cur
+                cur = cur._prev
 
     def __reversed__(self):
         return _node_list(self.graph, '_next' if self.direction == '_prev' else '_prev')
@@ -116,11 +132,55 @@ class Graph:
         self._used_names : Dict[str, int] = {}  # base name -> number
         self._insert = self._root.prepend
         self._len = 0
+        # Nodes of the graph by op and by (op, target), so that find_nodes does
+        # not have to iterate over the whole graph. Nodes whose target is not
+        # hashable are only indexed by op. Node re-files itself when its op or
+        # target is changed. The index is not kept in graph order, find_nodes
+        # sorts what it finds by Node._sort_key instead.
+        #
+        # Are dicts to act as "ordered sets". Keys are significant, value dont-care
+        self._nodes_by_op : Dict[str, Dict[Node, None]] = {}
+        self._nodes_by_op_target : Dict[Tuple[str, Target], Dict[Node, None]] = {}
 
     @property
     def nodes(self):
         return _node_list(self)
 
+    def find_nodes(self, *, op: str, target: Optional[Target] = None) -> List[Node]:
+        """
+        Return the Nodes in this Graph with opcode `op` and, if given, target
+        `target`, in the same order as in `nodes`. Unlike filtering `nodes`,
+        this does not iterate over the whole Graph.
+        """
+        if target is None:
+            found : Iterable[Node] = self._nodes_by_op.get(op, {})
+        elif not _is_hashable(target):
+            found = [n for n in self._nodes_by_op.get(op, {}) if n.target == target]
+        else:
+            found = self._nodes_by_op_target.get((op, target), {})
+        return sorted(found, key=lambda n: n._sort_key)
+
+    def _add_to_index(self, n : Node, by_op : bool = True):
+        if by_op:
+            self._nodes_by_op.setdefault(n.op, {})[n] = None
+        if _is_hashable(n.target):
+            self._nodes_by_op_target.setdefault((n.op, n.target), {})[n] = None
+        n._indexed = True
+
+    def _remove_from_index(self, n : Node, by_op : bool = True):
+        if by_op:
+            nodes = self._nodes_by_op[n.op]
+            del nodes[n]
+            if not nodes:
+                del self._nodes_by_op[n.op]
+        if _is_hashable(n.target):
+            key = (n.op, n.target)
+            nodes = self._nodes_by_op_target[key]
+            del nodes[n]
+            if not nodes:
+                del self._nodes_by_op_target[key]
+        n._indexed = False
+
     def graph_copy(self, g : 'Graph', val_map : Dict[Node, Node]) -> Optional[Argument]:
         """
         Append all nodes from graph `g` to this graph. `val_map` should be a dictionary
@@ -149,6 +209,7 @@ class Graph:
         n = Node(self, sanitized_name, op, target, args, kwargs, type_expr)
         self._insert(n)
         self._len += 1
+        self._add_to_index(n)
         return n
 
     def erase_node(self, to_erase : Node):
@@ -160,10 +221,19 @@ class Graph:
             raise RuntimeError(f'Tried to erase Node {to_erase} but it still had {len(to_erase.users)} '
                                f'users in the graph: {to_erase.users}!')
 
+        self._remove_from_index(to_erase)
         to_erase._remove_from_list()
         to_erase._erased = True  # iterators may retain handles to erased nodes
         self._len -= 1
 
+        # Null out the erased Node's uses of other Nodes, so that they no longer
+        # list it in their users and it no longer keeps them alive
+        new_args = map_arg(to_erase.args, lambda n: None)
+        new_kwargs = map_arg(to_erase.kwargs, lambda n: None)
+        assert isinstance(new_args, tuple)
+        assert isinstance(new_kwargs, dict)
+        to_erase._update_args_kwargs(new_args, new_kwargs)
+
     def inserting_before(self, n: Optional[Node] = None):
         """Set the point at which create_node and companion methods will insert into the graph.
         When used within a 'with' statement, this will temporary set the insert point and
@@ -456,8 +526,8 @@ def forward(self, {', '.join(free_vars)}){maybe_return_annotation}:
                 raise RuntimeError(f'Node {node} had unknown opcode {node.op}!')
             if node.graph is not self:
                 raise RuntimeError(f'Node \'{node}\' does not belong to this Graph!')
-            map_arg(node.args, lambda arg: check_arg(arg, node))
-            map_arg(node.kwargs, lambda arg: check_arg(arg, node))
+            walk_arg(node.args, lambda arg: check_arg(arg, node))
+            walk_arg(node.kwargs, lambda arg: check_arg(arg, node))
             seen_values.add(node)
 
             if node.name in seen_names:
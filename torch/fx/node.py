@@ -1,5 +1,5 @@
 # Nodes represent a definition of a value in our graph of operators.
-from typing import TYPE_CHECKING, Union, Callable, Any, Set, Tuple, List, Optional, Dict
+from typing import TYPE_CHECKING, Union, Callable, Any, Tuple, List, Optional, Dict
 import torch
 
 if TYPE_CHECKING:
@@ -19,21 +19,41 @@ Argument = Optional[Union[
     BaseArgumentTypes
 ]]
 
+_VALID_OPS = frozenset(['placeholder', 'call_method', 'call_module', 'call_function', 'get_attr', 'output', 'root'])
+
 class Node:
+    # Slots make attribute access on the hot paths (graph iteration, args and
+    # users bookkeeping) cheaper and nodes smaller. __dict__ is kept so that
+    # passes can still tag nodes with their own attributes.
+    __slots__ = ('graph', 'name', '_op', '_target', '_indexed', '_args', '_kwargs', '_input_nodes', '_args_input_nodes',
+                 '_kwargs_input_nodes', 'users', 'type', '_prev', '_next', '_sort_key', '_erased', '__dict__')
+
     def __init__(self, graph: 'Graph', name: str, op: str, target: Target,
                  args: Tuple[Argument, ...], kwargs: Dict[str, Argument],
                  type : Optional[Any] = None) -> None:
         self.graph = graph
         self.name = name  # unique name of value being created
-        assert op in ['placeholder', 'call_method', 'call_module', 'call_function', 'get_attr', 'output', 'root']
-        self.op = op  # the kind of operation = placeholder|call_method|call_module|call_function|get_attr
-        if op in ['call_method', 'call_module']:
+        assert op in _VALID_OPS
+        self._op = op  # the kind of operation = placeholder|call_method|call_module|call_function|get_attr
+        if op == 'call_method' or op == 'call_module':
             assert isinstance(target, str)
-        self.target = target  # for method/module/function, the name of the method/module/function/attr
+        self._target = target  # for method/module/function, the name of the method/module/function/attr
         # being invoked, e.g add, layer1, or torch.add
+        # Whether the Graph lists this Node in its index for find_nodes
+        self._indexed = False
         self._args : Tuple[Argument, ...] = ()
         self._kwargs : Dict[str, Argument] = {}
-        self.args, self.kwargs = args, kwargs
+        # All of the nodes used in args and kwargs, in order of first use. Kept
+        # up to date by _update_args_kwargs so that neither the users bookkeeping
+        # nor input_nodes has to walk the arguments again. The nodes used in args
+        # and in kwargs are also kept separately, so that setting only one of them
+        # does not walk the other.
+        #
+        # Are dicts to act as "ordered sets". Keys are significant, value dont-care
+        self._input_nodes : Dict['Node', None] = {}
+        self._args_input_nodes : Dict['Node', None] = {}
+        self._kwargs_input_nodes : Dict['Node', None] = {}
+        self._update_args_kwargs(args, kwargs)
         # All of the nodes that use the value produced by this Node
         # Note one user may correspond to several uses, e.g. the node fo `x + x`
         # would appear once here, but represents two uses.
@@ -53,6 +73,8 @@ class Node:
         self.type : Optional[Any] = type
         self._prev = self
         self._next = self
+        # Orders the nodes of a graph like the list of nodes does, see prepend
+        self._sort_key : Tuple[int, ...] = ()
         self._erased = False
 
     @property
@@ -79,6 +101,21 @@ class Node:
         p._next, x._prev = x, p
         x._next, self._prev = self, x
 
+        # Give x a sort key that compares between the keys of p and self. The
+        # root's key is () and compares before all others, but as the last
+        # node's successor it stands for the end of the list. Appending at
+        # either end keeps keys one long; inserting between neighbours of the
+        # same length makes a key one longer.
+        psk, nsk = p._sort_key, self._sort_key
+        if len(psk) > len(nsk):
+            *prefix, idx = psk[:len(nsk) + 1]
+            x._sort_key = (*prefix, idx + 1)
+        elif len(psk) < len(nsk):
+            *prefix, idx = nsk[:len(psk) + 1]
+            x._sort_key = (*prefix, idx - 1)
+        else:
+            x._sort_key = (*psk, 0)
+
     def append(self, x: 'Node'):
         """Insert x after this node in the list of nodes in the graph.
         Equvalent to `self.next.prepend(x)`
@@ -92,6 +129,33 @@ class Node:
         p, n = self._prev, self._next
         p._next, n._prev = n, p
 
+    @property
+    def op(self) -> str:
+        return self._op
+
+    @op.setter
+    def op(self, op : str):
+        # Keep the Graph's index of nodes by op and target up to date
+        if self._indexed:
+            self.graph._remove_from_index(self)
+            self._op = op
+            self.graph._add_to_index(self)
+        else:
+            self._op = op
+
+    @property
+    def target(self) -> Target:
+        return self._target
+
+    @target.setter
+    def target(self, target : Target):
+        if self._indexed:
+            self.graph._remove_from_index(self, by_op=False)
+            self._target = target
+            self.graph._add_to_index(self, by_op=False)
+        else:
+            self._target = target
+
     @property
     def args(self) -> Tuple[Argument, ...]:
         return self._args
@@ -108,21 +172,50 @@ class Node:
     def kwargs(self, k : Dict[str, Argument]):
         self._update_args_kwargs(new_args=self._args, new_kwargs=k)
 
+    @property
+    def input_nodes(self) -> List['Node']:
+        """
+        Return all of the Nodes used in this Node's args and kwargs, in order of
+        first use, with each Node appearing once.
+        """
+        return list(self._input_nodes)
+
     def _update_args_kwargs(self, new_args : Tuple[Argument, ...], new_kwargs : Dict[str, Argument]):
-        old_defs = self._collect_all_defs()
+        old_defs = self._input_nodes
+        # The args and kwargs setters pass the other side through unchanged
+        if new_args is not self._args:
+            self._args_input_nodes = {}
+            walk_arg(new_args, self._args_input_nodes.setdefault)
+        if new_kwargs is not self._kwargs:
+            self._kwargs_input_nodes = {}
+            walk_arg(new_kwargs, self._kwargs_input_nodes.setdefault)
+        self._args = new_args
+        self._kwargs = new_kwargs
+        new_defs = dict(self._args_input_nodes)
+        new_defs.update(self._kwargs_input_nodes)
+        self._input_nodes = new_defs
+        for n in old_defs:
+            if n not in new_defs:
+                n.users.pop(self)
+        for n in new_defs:
+            if n not in old_defs:
+                n.users.setdefault(self)
+
+    # Same as _update_args_kwargs for new args and kwargs that are the old ones
+    # with old replaced by new, except that the users of old and new are left
+    # for the caller to update. Since that is the only change to the set of
+    # input nodes, it is applied directly instead of walking the new arguments.
+    # The input nodes of a side that did not contain old are kept as they are.
+    def _replace_input_node(self, old : 'Node', new : 'Node',
+                            new_args : Tuple[Argument, ...], new_kwargs : Dict[str, Argument],
+                            args_changed : bool, kwargs_changed : bool):
         self._args = new_args
         self._kwargs = new_kwargs
-        new_defs = self._collect_all_defs()
-        for to_remove in old_defs - new_defs:
-            to_remove.users.pop(self)
-        for to_add in new_defs - old_defs:
-            to_add.users.setdefault(self)
-
-    def _collect_all_defs(self) -> Set['Node']:
-        defs = set()
-        map_arg(self._args, lambda n: defs.add(n))
-        map_arg(self._kwargs, lambda n: defs.add(n))
-        return defs
+        self._input_nodes = {new if n is old else n: None for n in self._input_nodes}
+        if args_changed:
+            self._args_input_nodes = {new if n is old else n: None for n in self._args_input_nodes}
+        if kwargs_changed:
+            self._kwargs_input_nodes = {new if n is old else n: None for n in self._kwargs_input_nodes}
 
     def __repr__(self) -> str:
         return self.name
@@ -134,31 +227,135 @@ class Node:
         """
         to_process = list(self.users)
         for use_node in to_process:
-            def maybe_replace_node(n : Node) -> Node:
-                if n == self:
-                    return replace_with
-                else:
-                    return n
-
-            new_args = map_arg(use_node.args, maybe_replace_node)
-            new_kwargs = map_arg(use_node.kwargs, maybe_replace_node)
+            new_args, args_changed = _replace_node_in_arg(use_node.args, self, replace_with)
+            new_kwargs, kwargs_changed = _replace_node_in_arg(use_node.kwargs, self, replace_with)
             assert isinstance(new_args, tuple)
             assert isinstance(new_kwargs, dict)
-            use_node._update_args_kwargs(new_args, new_kwargs)
+            use_node._replace_input_node(self, replace_with, new_args, new_kwargs, args_changed, kwargs_changed)
+
+        # Every user of self is now a user of replace_with instead. Move them in
+        # one update, which keeps the same order as adding them one at a time.
+        users, self.users = self.users, {}
+        replace_with.users.update(users)
 
         assert len(self.users) == 0
         return to_process
 
 
+# How the argument traversals below treat each type of value. Looking up
+# type(a) here is a single dict lookup, where a chain of isinstance checks
+# costs one call per case. Other types are classified with issubclass. Only
+# subclasses of the containers and of Node are added to the table, so that
+# it cannot grow with every leaf type that shows up in arguments.
+_SEQUENCE, _DICT, _SLICE, _NODE, _LEAF = range(1, 6)
+_ARG_KINDS : Dict[type, int] = {tuple: _SEQUENCE, list: _SEQUENCE, dict: _DICT, slice: _SLICE, Node: _NODE,
+                                type(None): _LEAF, **{t: _LEAF for t in base_types}}
+
+def _arg_kind(t : type) -> int:
+    if issubclass(t, (tuple, list)):
+        kind = _SEQUENCE
+    elif issubclass(t, dict):
+        kind = _DICT
+    elif issubclass(t, slice):
+        kind = _SLICE
+    elif issubclass(t, Node):
+        kind = _NODE
+    else:
+        return _LEAF
+    _ARG_KINDS[t] = kind
+    return kind
+
 def map_arg(a: Argument, fn: Callable[[Node], Argument]) -> Argument:
     """ apply fn to each Node appearing arg. arg may be a list, tuple, slice, or dict with string keys. """
-    if isinstance(a, (tuple, list)):
-        return type(a)(map_arg(elem, fn) for elem in a)
-    elif isinstance(a, dict):
-        return {k: map_arg(v, fn) for k, v in a.items()}
-    elif isinstance(a, slice):
-        return slice(map_arg(a.start, fn), map_arg(a.stop, fn), map_arg(a.step, fn))
-    elif isinstance(a, Node):
-        return fn(a)
+    kind = _ARG_KINDS.get(type(a)) or _arg_kind(type(a))
+    if kind == _SEQUENCE:
+        # Nodes and leaves are handled in the loop, so flat tuples like the
+        # args of most nodes are mapped without any recursive calls
+        out : List[Argument] = []
+        # elem is only known to be a Node once its kind has been looked up
+        elem : Any
+        for elem in a:  # type: ignore
+            k = _ARG_KINDS.get(type(elem)) or _arg_kind(type(elem))
+            if k == _NODE:
+                out.append(fn(elem))
+            elif k == _LEAF:
+                out.append(elem)
+            else:
+                out.append(map_arg(elem, fn))
+        if type(a) is tuple:
+            return tuple(out)
+        elif type(a) is list:
+            return out
+        return type(a)(out)  # type: ignore
+    elif kind == _DICT:
+        return {k: map_arg(v, fn) for k, v in a.items()}  # type: ignore
+    elif kind == _SLICE:
+        return slice(map_arg(a.start, fn), map_arg(a.stop, fn), map_arg(a.step, fn))  # type: ignore
+    elif kind == _NODE:
+        return fn(a)  # type: ignore
     else:
         return a
+
+
+def walk_arg(a: Argument, fn: Callable[[Node], Any]) -> None:
+    """ call fn on each Node appearing in arg, in the same order as map_arg. arg may be a list, tuple, slice,
+    or dict with string keys. Unlike map_arg, nothing is rebuilt, so use this when only the Nodes are needed. """
+    kind = _ARG_KINDS.get(type(a)) or _arg_kind(type(a))
+    if kind == _SEQUENCE or kind == _DICT:
+        elem : Any
+        for elem in (a if kind == _SEQUENCE else a.values()):  # type: ignore
+            k = _ARG_KINDS.get(type(elem)) or _arg_kind(type(elem))
+            if k == _NODE:
+                fn(elem)
+            elif k != _LEAF:
+                walk_arg(elem, fn)
+    elif kind == _SLICE:
+        walk_arg(a.start, fn)  # type: ignore
+        walk_arg(a.stop, fn)  # type: ignore
+        walk_arg(a.step, fn)  # type: ignore
+    elif kind == _NODE:
+        fn(a)  # type: ignore
+
+
+def _replace_node_in_arg(a: Argument, old: Node, new: Argument) -> Tuple[Argument, bool]:
+    # Equivalent to map_arg(a, lambda n: new if n is old else n), except that
+    # only the containers on a path to old are rebuilt; all others are shared
+    # with a. Also returns whether old was found.
+    kind = _ARG_KINDS.get(type(a)) or _arg_kind(type(a))
+    if kind == _SEQUENCE:
+        out : Optional[List[Argument]] = None
+        for i, elem in enumerate(a):  # type: ignore
+            if elem is old:
+                new_elem, changed = new, True
+            elif (_ARG_KINDS.get(type(elem)) or _arg_kind(type(elem))) >= _NODE:
+                continue
+            else:
+                new_elem, changed = _replace_node_in_arg(elem, old, new)
+            if changed:
+                if out is None:
+                    out = list(a)  # type: ignore
+                out[i] = new_elem
+        if out is None:
+            return a, False
+        if type(a) is tuple:
+            return tuple(out), True
+        elif type(a) is list:
+            return out, True
+        return type(a)(out), True  # type: ignore
+    elif kind == _DICT:
+        out_dict : Optional[Dict[str, Argument]] = None
+        for k, v in a.items():  # type: ignore
+            new_v, changed = _replace_node_in_arg(v, old, new)
+            if changed:
+                if out_dict is None:
+                    out_dict = dict(a)  # type: ignore
+                out_dict[k] = new_v
+        return (a, False) if out_dict is None else (out_dict, True)
+    elif kind == _SLICE:
+        start, start_changed = _replace_node_in_arg(a.start, old, new)  # type: ignore
+        stop, stop_changed = _replace_node_in_arg(a.stop, old, new)  # type: ignore
+        step, step_changed = _replace_node_in_arg(a.step, old, new)  # type: ignore
+        if start_changed or stop_changed or step_changed:
+            return slice(start, stop, step), True
+        return a, False
+    return (new, True) if a is old else (a, False)